@@ -1,15 +1,60 @@
+import gzip
+import io
+import os
+import threading
+import time
+from contextlib import closing
+
 import pandas as pd
 import streamlit as st
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-from src.data_processing import run_data_processing
-from src.facebook_crawling import run_facebook_crawling
-from src.sentiment_analysis import run_sentiment_analysis
-from src.sentiment_charts import (
-    render_post_overview_chart,
-    render_sentiment_pie_chart,
-    render_wordcloud,
+from src.analytics_store import (
+    connect_store,
+    latest_post_id,
+    list_posts,
+    query_comment_snapshots,
+    query_comments,
+    query_sentiment_counts,
+    save_analysis,
 )
+from src.serve import warm_up
+
+SCRIPT_STARTED = time.perf_counter()
+
+PAGE_SIZE_OPTIONS = [50, 100, 500]
+EXPORT_CHUNK_SIZE = 50_000
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    # One read connection per process; saves use their own short-lived one
+    return connect_store(check_same_thread=False)
+
+
+@st.cache_data(show_spinner=False)
+def get_history_posts():
+    return list_posts(get_store())
+
+
+def report_startup_time():
+    if st.session_state.get("startup_reported"):
+        return
+    st.session_state.startup_reported = True
+    elapsed_ms = (time.perf_counter() - SCRIPT_STARTED) * 1000
+    print(f"[startup] First paint in {elapsed_ms:.0f} ms")
 
 
 def configure_streamlit():
@@ -56,6 +101,10 @@ def run_analysis(post_links):
         st.warning("⚠️ Bạn cần nhập ít nhất một liên kết từ textarea hoặc từ file.")
         return
 
+    from src.data_processing import build_post_analytics, run_data_processing
+    from src.facebook_crawling import run_facebook_crawling
+    from src.sentiment_analysis import run_sentiment_analysis
+
     try:
         progress_bar = st.progress(0)
         status_text = st.empty()
@@ -70,6 +119,12 @@ def run_analysis(post_links):
             post_links, on_progress=update_progress
         )
 
+        if "is_complete" in df_posts.columns and not df_posts["is_complete"].all():
+            n_incomplete = int((~df_posts["is_complete"].astype(bool)).sum())
+            st.warning(
+                f"⚠️ {n_incomplete} bài viết chỉ thu thập được một phần dữ liệu do quá thời gian."
+            )
+
         progress_bar.progress(50)
         status_text.text("🧼 Đang làm sạch dữ liệu...")
         df_posts_cleaned, df_comments_cleaned = run_data_processing(
@@ -83,8 +138,19 @@ def run_analysis(post_links):
         progress_bar.progress(100)
         status_text.text("✅ Phân tích cảm xúc hoàn tất!")
 
+        st.session_state.run_id = st.session_state.get("run_id", 0) + 1
         st.session_state.df_posts_cleaned = df_posts_cleaned
         st.session_state.df_comments_with_sentiment = df_comments_with_sentiment
+        st.session_state.df_post_analytics = build_post_analytics(
+            df_posts_cleaned, df_comments_with_sentiment
+        )
+
+        try:
+            with closing(connect_store()) as conn:
+                save_analysis(conn, df_posts_cleaned, df_comments_with_sentiment)
+            get_history_posts.clear()
+        except Exception:
+            st.warning("⚠️ Không thể lưu kết quả vào lịch sử phân tích.")
 
     except Exception as e:
         st.error("❌ Có lỗi xảy ra:")
@@ -128,6 +194,85 @@ def render_sentiment_filter(df):
             st.rerun()
 
 
+def iter_csv_chunks(df, chunk_size=EXPORT_CHUNK_SIZE):
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def build_export(df, export_format):
+    buffer = io.BytesIO()
+
+    if export_format == "Parquet":
+        df.to_parquet(buffer, index=False)
+    elif export_format == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as gz_file:
+            for chunk in iter_csv_chunks(df):
+                gz_file.write(chunk)
+    else:
+        for chunk in iter_csv_chunks(df):
+            buffer.write(chunk)
+
+    return buffer.getvalue()
+
+
+def select_page(n_rows, key_prefix=""):
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        page_size = st.selectbox(
+            "Số dòng mỗi trang", PAGE_SIZE_OPTIONS, key=f"{key_prefix}page_size"
+        )
+    total_pages = max(1, -(-n_rows // page_size))
+    if st.session_state.get(f"{key_prefix}page_number", 1) > total_pages:
+        st.session_state[f"{key_prefix}page_number"] = 1
+    with col2:
+        page = st.number_input(
+            f"Trang (1 - {total_pages})",
+            min_value=1,
+            max_value=total_pages,
+            step=1,
+            key=f"{key_prefix}page_number",
+        )
+
+    return (page - 1) * page_size, page_size
+
+
+def render_paginated_table(df, columns):
+    start, page_size = select_page(len(df))
+    st.dataframe(df.iloc[start : start + page_size][columns], use_container_width=True)
+
+
+def render_export(filtered_df):
+    selected = st.session_state.selected_sentiment
+    _, col2, _ = st.columns([1, 1, 1])
+    with col2:
+        export_format = st.selectbox(
+            "Định dạng tải xuống", list(EXPORT_FORMATS), key="export_format"
+        )
+
+    extension, mime = EXPORT_FORMATS[export_format]
+    export_key = (st.session_state.get("run_id"), selected, export_format)
+    if st.session_state.get("export_key") != export_key:
+        st.session_state.export_key = export_key
+        st.session_state.export_data = None
+
+    with col2:
+        if st.session_state.export_data is None:
+            if st.button(f"📦 Tạo file {export_format}", key="build_export_btn"):
+                st.session_state.export_data = build_export(filtered_df, export_format)
+                st.rerun()
+        else:
+            filename = (
+                f"sentiment_results_{selected.lower().replace(' ', '_')}.{extension}"
+            )
+            st.download_button(
+                f"📥 Tải kết quả {export_format} ({selected})",
+                data=st.session_state.export_data,
+                file_name=filename,
+                mime=mime,
+            )
+
+
 def render_results_table(filtered_df):
     display_columns = ["comment", "sentiment"]
     available_columns = [col for col in display_columns if col in filtered_df.columns]
@@ -141,19 +286,8 @@ def render_results_table(filtered_df):
         st.warning("⚠️ Không có bình luận để hiển thị.")
         return True
 
-    st.dataframe(filtered_df[available_columns], use_container_width=True)
-
-    csv = filtered_df.to_csv(index=False)
-    filename = f"sentiment_results_{st.session_state.selected_sentiment.lower().replace(' ', '_')}.csv"
-
-    _, col2, _ = st.columns([1, 1, 1])
-    with col2:
-        st.download_button(
-            f"📥 Tải kết quả CSV ({st.session_state.selected_sentiment})",
-            data=csv,
-            file_name=filename,
-            mime="text/csv",
-        )
+    render_paginated_table(filtered_df, available_columns)
+    render_export(filtered_df)
 
     return True
 
@@ -172,6 +306,12 @@ def check_empty_comments(df_comments_with_sentiment):
 def render_sentiment_stats(
     df_posts_cleaned, df_comments_with_sentiment, comment_checked
 ):
+    from src.sentiment_charts import (
+        render_post_overview_chart,
+        render_sentiment_pie_chart,
+        render_wordcloud,
+    )
+
     st.markdown("### 📊 Thống kê tổng quan:")
     sentiment_counts = df_comments_with_sentiment["sentiment"].value_counts()
 
@@ -181,8 +321,134 @@ def render_sentiment_stats(
 
     render_wordcloud(df_comments_with_sentiment)
 
+    if not comment_checked:
+        render_keyword_sentiment(df_comments_with_sentiment)
+
+
+@st.cache_data(show_spinner=False)
+def get_keyword_index(df_comments_with_sentiment):
+    from src.keyword_analysis import build_keyword_index
+    from src.sentiment_charts import segment_comments
 
-def display_results(df_posts_cleaned, df_comments_with_sentiment):
+    segmented = segment_comments(df_comments_with_sentiment["comment"])
+    return build_keyword_index(
+        df_comments_with_sentiment,
+        segmented,
+        labels=["Tiêu cực", "Trung tính", "Tích cực"],
+    )
+
+
+@st.cache_data(show_spinner=False)
+def get_keyword_trend_index(urls, last_post_id):
+    from src.keyword_analysis import build_keyword_index
+    from src.sentiment_charts import segment_comments
+
+    df_history = query_comment_snapshots(get_store(), list(urls))
+    if df_history.empty:
+        return None
+
+    # Each stored analysis run of the posts is one snapshot of the trend
+    return build_keyword_index(
+        df_history,
+        segment_comments(df_history["comment"]),
+        labels=["Tiêu cực", "Trung tính", "Tích cực"],
+        snapshot_column="analyzed_at",
+    )
+
+
+def render_keyword_trend(df_comments_with_sentiment, keywords):
+    try:
+        # Keyed on the newest stored analysis, which every session sees alike
+        urls = tuple(df_comments_with_sentiment["url"].unique())
+        trend_index = get_keyword_trend_index(
+            urls, latest_post_id(get_store(), list(urls))
+        )
+    except Exception:
+        return
+    if trend_index is None or len(trend_index.snapshots) < 2:
+        return
+
+    keywords = [keyword for keyword in keywords if keyword in trend_index.vocabulary]
+    if not keywords:
+        return
+
+    keyword = st.selectbox(
+        "Xu hướng từ khóa qua các lần phân tích",
+        keywords,
+        format_func=lambda keyword: keyword.replace("_", " "),
+        key="keyword_trend",
+    )
+    st.line_chart(trend_index.trend(keyword))
+
+
+def render_keyword_sentiment(df_comments_with_sentiment):
+    keyword_index = get_keyword_index(df_comments_with_sentiment)
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.markdown("#### Từ khóa gắn với cảm xúc:")
+    with col2:
+        sentiment_label = st.selectbox(
+            "Chọn cảm xúc cho từ khóa",
+            ["Tiêu cực", "Tích cực", "Trung tính"],
+            label_visibility="collapsed",
+            key="keyword_sentiment",
+        )
+
+    df_keywords = keyword_index.top_keywords(sentiment_label, min_count=3)
+    if df_keywords.empty:
+        st.info("Chưa đủ dữ liệu để xác định từ khóa nổi bật.")
+        return
+
+    keywords = df_keywords["keyword"].tolist()
+    df_keywords["keyword"] = df_keywords["keyword"].str.replace("_", " ")
+    df_keywords = df_keywords.rename(
+        columns={
+            "keyword": "Từ khóa",
+            "count": "Số bình luận",
+            "share": "Tỷ lệ",
+            "lift": "Lift",
+        }
+    )
+    st.dataframe(df_keywords, hide_index=True, use_container_width=True)
+
+    render_keyword_trend(df_comments_with_sentiment, keywords)
+
+
+def render_post_analytics(df_post_analytics):
+    if df_post_analytics is None or df_post_analytics.empty:
+        return
+
+    st.markdown("#### Phân tích theo bài viết")
+    column_names = {
+        "engagement_rank": "Hạng tương tác",
+        "url": "Bài viết",
+        "total_engagement": "Tổng tương tác",
+        "scored_comments": "Bình luận",
+        "positive_ratio": "Tỷ lệ tích cực",
+        "neutral_ratio": "Tỷ lệ trung tính",
+        "negative_ratio": "Tỷ lệ tiêu cực",
+        "negative_share": "Tỷ trọng tiêu cực",
+        "engagement_per_comment": "Tương tác / bình luận",
+    }
+    df_display = (
+        df_post_analytics.sort_values("engagement_rank")
+        .reindex(columns=list(column_names))
+        .rename(columns=column_names)
+    )
+    st.dataframe(df_display, hide_index=True, use_container_width=True)
+
+    st.download_button(
+        "📥 Tải phân tích bài viết (CSV)",
+        data=df_post_analytics.to_csv(index=False),
+        file_name="post_analytics.csv",
+        mime="text/csv",
+    )
+
+
+def display_results(
+    df_posts_cleaned, df_comments_with_sentiment, df_post_analytics=None
+):
     if df_comments_with_sentiment is None or df_comments_with_sentiment.empty:
         st.error("❌ Không có dữ liệu để hiển thị.")
         return
@@ -217,12 +483,62 @@ def display_results(df_posts_cleaned, df_comments_with_sentiment):
             render_sentiment_stats(
                 df_posts_cleaned, df_comments_with_sentiment, comment_checked
             )
+            render_post_analytics(df_post_analytics)
         else:
             st.error("❌ Không tìm thấy các cột dữ liệu cần thiết.")
     else:
         st.warning(f"❌ Không có bình luận nào có cảm xúc '{selected}'")
 
 
+def render_history():
+    conn = get_store()
+    df_history_posts = get_history_posts()
+    if df_history_posts.empty:
+        st.info("Chưa có dữ liệu lịch sử.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        authors = sorted(df_history_posts["author"].dropna().unique().tolist())
+        author = st.selectbox("Tác giả", ["Tất cả"] + authors, key="history_author")
+    with col2:
+        urls = df_history_posts["url"].unique().tolist()
+        url = st.selectbox("Bài viết", ["Tất cả"] + urls, key="history_url")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        date_range = st.date_input("Khoảng thời gian", value=(), key="history_dates")
+    with col4:
+        sentiment = st.selectbox(
+            "Cảm xúc",
+            ["Tất cả", "Tích cực", "Tiêu cực", "Trung tính"],
+            key="history_sentiment",
+        )
+
+    filters = {
+        "url": None if url == "Tất cả" else url,
+        "author": None if author == "Tất cả" else author,
+        "start": date_range[0] if len(date_range) > 0 else None,
+        "end": date_range[1] if len(date_range) > 1 else None,
+        "sentiment": None if sentiment == "Tất cả" else sentiment,
+    }
+
+    df_counts = query_sentiment_counts(conn, **filters)
+    if df_counts.empty:
+        st.warning("⚠️ Không có dữ liệu phù hợp với bộ lọc.")
+        return
+
+    st.bar_chart(df_counts.set_index("sentiment")["count"])
+
+    n_comments = int(df_counts["count"].sum())
+    start, page_size = select_page(n_comments, key_prefix="history_")
+    df_history_comments = query_comments(conn, limit=page_size, offset=start, **filters)
+    st.markdown(
+        f"**Hiển thị {start + 1} - {start + len(df_history_comments)} / {n_comments} bình luận**"
+    )
+    st.dataframe(df_history_comments, use_container_width=True)
+
+
 def main():
     configure_streamlit()
     st.title("Facebook Sentiment Analysis")
@@ -236,6 +552,10 @@ def main():
     with col2:
         clicked = st.button("🚀 Phân tích")
 
+    report_startup_time()
+    if os.getenv("WARMUP_ON_START", "1") == "1":
+        start_warm_up()
+
     if clicked:
         run_analysis(post_links)
 
@@ -243,8 +563,13 @@ def main():
         display_results(
             st.session_state.df_posts_cleaned,
             st.session_state.df_comments_with_sentiment,
+            st.session_state.get("df_post_analytics"),
         )
 
+    # History queries only run while the section is switched on
+    if st.toggle("📚 Lịch sử phân tích", key="show_history"):
+        render_history()
+
 
 if __name__ == "__main__":
     main()
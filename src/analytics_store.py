@@ -0,0 +1,228 @@
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+DEFAULT_DB_PATH = "data/analytics.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    author TEXT,
+    content TEXT,
+    reactions_count INTEGER,
+    comments_count INTEGER,
+    shares_count INTEGER,
+    total_comments_crawled INTEGER,
+    total_engagement INTEGER,
+    analyzed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES posts(id),
+    comment TEXT,
+    sentiment TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS post_sentiment_counts (
+    post_id INTEGER NOT NULL REFERENCES posts(id),
+    sentiment TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (post_id, sentiment)
+);
+
+CREATE INDEX IF NOT EXISTS idx_posts_url ON posts(url);
+CREATE INDEX IF NOT EXISTS idx_posts_author ON posts(author);
+CREATE INDEX IF NOT EXISTS idx_posts_analyzed_at ON posts(analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_comments_post_sentiment ON comments(post_id, sentiment);
+CREATE INDEX IF NOT EXISTS idx_comments_sentiment ON comments(sentiment);
+"""
+
+POST_COLUMNS = [
+    "url",
+    "author",
+    "content",
+    "reactions_count",
+    "comments_count",
+    "shares_count",
+    "total_comments_crawled",
+    "total_engagement",
+]
+
+
+def connect_store(
+    db_path: str = DEFAULT_DB_PATH, check_same_thread: bool = True
+) -> sqlite3.Connection:
+    """Open the analytics database and create its tables and indexes if needed."""
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_analysis(
+    conn: sqlite3.Connection,
+    df_posts: pd.DataFrame,
+    df_comments_with_sentiment: pd.DataFrame,
+    analyzed_at: Optional[datetime] = None,
+) -> int:
+    """Append one analysis run to the store and return the number of posts saved."""
+
+    analyzed_at_str = (analyzed_at or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    df_comments = df_comments_with_sentiment[
+        df_comments_with_sentiment["comment"].fillna("").astype(str).str.strip() != ""
+    ]
+
+    df_post_values = df_posts.reindex(columns=POST_COLUMNS).astype(object)
+    df_post_values = df_post_values.where(df_post_values.notna(), None)
+    comments_by_url = dict(tuple(df_comments.groupby("url", sort=False)))
+
+    with conn:
+        for values in df_post_values.itertuples(index=False, name=None):
+            cursor = conn.execute(
+                f"INSERT INTO posts ({', '.join(POST_COLUMNS)}, analyzed_at) "
+                f"VALUES ({', '.join('?' * (len(POST_COLUMNS) + 1))})",
+                [*values, analyzed_at_str],
+            )
+            post_id = cursor.lastrowid
+
+            post_comments = comments_by_url.get(values[0])
+            if post_comments is None:
+                continue
+
+            conn.executemany(
+                "INSERT INTO comments (post_id, comment, sentiment) VALUES (?, ?, ?)",
+                [
+                    (post_id, comment, sentiment)
+                    for comment, sentiment in zip(
+                        post_comments["comment"], post_comments["sentiment"]
+                    )
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO post_sentiment_counts (post_id, sentiment, n) VALUES (?, ?, ?)",
+                [
+                    (post_id, sentiment, int(n))
+                    for sentiment, n in post_comments["sentiment"]
+                    .value_counts()
+                    .items()
+                ],
+            )
+
+    return len(df_posts)
+
+
+def _build_filters(
+    url: Optional[str] = None,
+    author: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Tuple[str, List]:
+    """Build the WHERE clause shared by the post-level queries."""
+
+    clauses, params = [], []
+    if url:
+        clauses.append("p.url = ?")
+        params.append(url)
+    if author:
+        clauses.append("p.author = ?")
+        params.append(author)
+    if start:
+        clauses.append("p.analyzed_at >= ?")
+        params.append(start.isoformat())
+    if end:
+        clauses.append("p.analyzed_at < ?")
+        params.append((end + timedelta(days=1)).isoformat())
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def list_posts(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Return the distinct analyzed posts with their authors and last analysis time."""
+
+    return pd.read_sql_query(
+        "SELECT url, author, MAX(analyzed_at) AS last_analyzed_at "
+        "FROM posts GROUP BY url, author ORDER BY last_analyzed_at DESC",
+        conn,
+    )
+
+
+def query_sentiment_counts(
+    conn: sqlite3.Connection,
+    url: Optional[str] = None,
+    author: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    sentiment: Optional[str] = None,
+) -> pd.DataFrame:
+    """Return pre-aggregated sentiment counts for the posts matching the filters."""
+
+    where, params = _build_filters(url, author, start, end)
+    if sentiment:
+        where = f"{where} AND c.sentiment = ?" if where else "WHERE c.sentiment = ?"
+        params.append(sentiment)
+
+    return pd.read_sql_query(
+        "SELECT c.sentiment, SUM(c.n) AS count "
+        "FROM post_sentiment_counts c JOIN posts p ON p.id = c.post_id "
+        f"{where} GROUP BY c.sentiment ORDER BY count DESC",
+        conn,
+        params=params,
+    )
+
+
+def query_comments(
+    conn: sqlite3.Connection,
+    url: Optional[str] = None,
+    author: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    sentiment: Optional[str] = None,
+    limit: int = 500,
+    offset: int = 0,
+) -> pd.DataFrame:
+    """Return stored comments matching the filters, newest analysis first."""
+
+    where, params = _build_filters(url, author, start, end)
+    if sentiment:
+        where = f"{where} AND c.sentiment = ?" if where else "WHERE c.sentiment = ?"
+        params.append(sentiment)
+
+    return pd.read_sql_query(
+        "SELECT p.url, p.author, p.analyzed_at, c.comment, c.sentiment "
+        "FROM comments c JOIN posts p ON p.id = c.post_id "
+        f"{where} ORDER BY p.analyzed_at DESC, c.id LIMIT ? OFFSET ?",
+        conn,
+        params=[*params, limit, offset],
+    )
+
+
+def query_comment_snapshots(conn: sqlite3.Connection, urls: List[str]) -> pd.DataFrame:
+    """Return every stored comment of the given posts with its analysis time."""
+
+    placeholders = ", ".join("?" * len(urls))
+    return pd.read_sql_query(
+        "SELECT p.url, p.analyzed_at, c.comment, c.sentiment "
+        "FROM comments c JOIN posts p ON p.id = c.post_id "
+        f"WHERE p.url IN ({placeholders}) ORDER BY p.analyzed_at, c.id",
+        conn,
+        params=list(urls),
+    )
+
+
+def latest_post_id(conn: sqlite3.Connection, urls: List[str]) -> Optional[int]:
+    """Return the id of the most recent stored analysis of any of the posts."""
+
+    placeholders = ", ".join("?" * len(urls))
+    row = conn.execute(
+        f"SELECT MAX(id) FROM posts WHERE url IN ({placeholders})", list(urls)
+    ).fetchone()
+    return row[0]
@@ -0,0 +1,253 @@
+import argparse
+import glob
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from typing import List, Tuple
+
+import pandas as pd
+from data_processing import (
+    build_post_analytics,
+    load_and_clean_comments,
+    load_and_clean_posts,
+)
+from facebook_crawling import (
+    build_post_records,
+    check_post_links,
+    crawl_facebook_post,
+    launch_browser,
+    new_crawl_page,
+)
+from playwright.sync_api import Page, sync_playwright
+from sentiment_analysis import SENTIMENT_LABELS, analyze_sentiment, get_model
+
+
+def read_post_links(path: str) -> List[str]:
+    """Read post links from a .txt file (one per line) or the first column of a .csv."""
+
+    if path.endswith(".csv"):
+        links = pd.read_csv(path).iloc[:, 0].dropna().astype(str).tolist()
+    else:
+        with open(path, encoding="utf-8") as f:
+            links = f.read().splitlines()
+
+    valid_links = []
+    for link in dict.fromkeys(link.strip() for link in links if link.strip()):
+        try:
+            check_post_links([link])
+            valid_links.append(link)
+        except ValueError as e:
+            print(f"[batch] Skipped: {e}")
+
+    return valid_links
+
+
+def checkpoint_id(url: str) -> str:
+    """Return a stable file-name-safe identifier for a post URL."""
+
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def checkpoint_dir(output_dir: str, complete: bool = True) -> str:
+    """Return the checkpoint folder for complete or partially crawled posts."""
+
+    checkpoints = os.path.join(output_dir, "checkpoints")
+    return checkpoints if complete else os.path.join(checkpoints, "partial")
+
+
+def is_checkpointed(output_dir: str, url: str) -> bool:
+    """Check whether the post has already been fully processed."""
+
+    return os.path.exists(
+        os.path.join(checkpoint_dir(output_dir), "posts", f"{checkpoint_id(url)}.csv")
+    )
+
+
+def write_csv_atomic(df: pd.DataFrame, path: str) -> None:
+    """Write a CSV file through a temporary file so readers never see partial data."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def save_checkpoint(
+    output_dir: str,
+    url: str,
+    df_posts: pd.DataFrame,
+    df_comments: pd.DataFrame,
+    complete: bool = True,
+) -> None:
+    """Persist one processed post. The post file is written last and marks completion."""
+
+    # Partially crawled posts are kept for the merge but retried on the next run
+    post_id = checkpoint_id(url)
+    target_dir = checkpoint_dir(output_dir, complete)
+    write_csv_atomic(
+        df_comments, os.path.join(target_dir, "comments", f"{post_id}.csv")
+    )
+    write_csv_atomic(df_posts, os.path.join(target_dir, "posts", f"{post_id}.csv"))
+
+    if complete:
+        for name in ["posts", "comments"]:
+            partial_path = os.path.join(
+                checkpoint_dir(output_dir, complete=False), name, f"{post_id}.csv"
+            )
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+
+def process_post(
+    page: Page,
+    url: str,
+    output_dir: str,
+    model_path: str,
+    inference_lock: threading.Lock,
+) -> Tuple[int, bool]:
+    """Crawl, clean and score one post, checkpoint it, and return its count and completeness."""
+
+    data = crawl_facebook_post(page, url)
+    post_summary, comment_rows = build_post_records(data)
+
+    df_posts = load_and_clean_posts(pd.DataFrame([post_summary]))
+    df_comments = load_and_clean_comments(pd.DataFrame(comment_rows))
+
+    with inference_lock:
+        tokenizer, model, device = get_model(model_path)
+        df_comments = analyze_sentiment(
+            df_comments, model, tokenizer, device, SENTIMENT_LABELS
+        )
+
+    save_checkpoint(output_dir, url, df_posts, df_comments, data["is_complete"])
+    return len(df_comments), data["is_complete"]
+
+
+def crawl_worker(
+    url_queue: queue.Queue,
+    output_dir: str,
+    model_path: str,
+    inference_lock: threading.Lock,
+    progress: dict,
+) -> None:
+    """Process links from the queue with a dedicated browser until it is empty."""
+
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        try:
+            page = new_crawl_page(browser)
+            while True:
+                try:
+                    url = url_queue.get_nowait()
+                except queue.Empty:
+                    return
+
+                try:
+                    n_comments, complete = process_post(
+                        page, url, output_dir, model_path, inference_lock
+                    )
+                    status = f"ok ({n_comments} comments)"
+                    if not complete:
+                        status = f"partial ({n_comments} comments), retried next run"
+                except Exception as e:
+                    status = f"failed: {e}"
+
+                with progress["lock"]:
+                    progress["done"] += 1
+                    print(
+                        f"[batch] {progress['done']}/{progress['total']} {url} {status}"
+                    )
+
+                time.sleep(random.uniform(1, 2))
+        finally:
+            browser.close()
+
+
+def merge_checkpoints(output_dir: str) -> None:
+    """Combine per-post checkpoints into the final files and the post analytics table."""
+
+    merged = {}
+    for name in ["posts", "comments"]:
+        paths = sorted(
+            glob.glob(os.path.join(checkpoint_dir(output_dir), name, "*.csv"))
+        )
+        done = {os.path.basename(path) for path in paths}
+        paths += sorted(
+            path
+            for path in glob.glob(
+                os.path.join(checkpoint_dir(output_dir, complete=False), name, "*.csv")
+            )
+            if os.path.basename(path) not in done
+        )
+        if not paths:
+            return
+        merged[name] = pd.concat(
+            (pd.read_csv(path) for path in paths), ignore_index=True
+        )
+        merged[name].to_csv(
+            os.path.join(output_dir, f"facebook_{name}.csv"), index=False
+        )
+
+    df_post_analytics = build_post_analytics(merged["posts"], merged["comments"])
+    df_post_analytics.to_csv(
+        os.path.join(output_dir, "facebook_post_analytics.csv"), index=False
+    )
+
+
+def run_batch(
+    links_path: str,
+    output_dir: str = "data/batch",
+    workers: int = 1,
+    model_path: str = "models/bert_sentiment_vietnamese",
+) -> None:
+    """Run crawl, cleaning and sentiment analysis over a file of post links."""
+
+    post_links = read_post_links(links_path)
+    pending = [url for url in post_links if not is_checkpointed(output_dir, url)]
+    print(
+        f"[batch] {len(post_links)} links, {len(post_links) - len(pending)} already done, "
+        f"{len(pending)} to process with {workers} worker(s)"
+    )
+
+    url_queue = queue.Queue()
+    for url in pending:
+        url_queue.put(url)
+
+    inference_lock = threading.Lock()
+    progress = {"done": 0, "total": len(pending), "lock": threading.Lock()}
+
+    threads = [
+        threading.Thread(
+            target=crawl_worker,
+            args=(url_queue, output_dir, model_path, inference_lock, progress),
+            name=f"crawler-{i}",
+        )
+        for i in range(min(workers, len(pending)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merge_checkpoints(output_dir)
+    print(f"[batch] Results written to {output_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl and analyze a file of Facebook post links without the UI."
+    )
+    parser.add_argument("links", help="Path to a .txt or .csv file of post links")
+    parser.add_argument("--output-dir", default="data/batch")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--model-path", default="models/bert_sentiment_vietnamese")
+    args = parser.parse_args()
+
+    run_batch(args.links, args.output_dir, args.workers, args.model_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import re
-from typing import Tuple
+import unicodedata
+from typing import Dict, Tuple
 
 import emoji
+import numpy as np
 import pandas as pd
 
 
@@ -32,6 +34,55 @@ def remove_emojis_from_text(text: str) -> str:
     return text_str
 
 
+# Old-style tone placement ("hoà") mapped to the new style ("hòa")
+TONE_PLACEMENT_MAP = {
+    "oà": "òa", "oá": "óa", "oả": "ỏa", "oã": "õa", "oạ": "ọa",
+    "oè": "òe", "oé": "óe", "oẻ": "ỏe", "oẽ": "õe", "oẹ": "ọe",
+    "uỳ": "ùy", "uý": "úy", "uỷ": "ủy", "uỹ": "ũy", "uỵ": "ụy",
+}  # fmt: skip
+TONE_PLACEMENT_PATTERN = re.compile("|".join(TONE_PLACEMENT_MAP))
+REPEATED_CHAR_PATTERN = re.compile(r"([^\W\d_])\1{2,}")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def strip_trailing_emoji(text: str) -> str:
+    """Remove emoji at the end of a text, keeping emoticons and punctuation."""
+
+    for item in reversed(emoji.emoji_list(text)):
+        if text[item["match_end"] :].strip():
+            break
+        text = text[: item["match_start"]]
+    return text.rstrip()
+
+
+def normalize_comment_text(text: str) -> str:
+    """Normalize a comment so that near-identical copies share the same form."""
+
+    if pd.isna(text):
+        return ""
+    text_str = unicodedata.normalize("NFC", str(text)).lower()
+    text_str = TONE_PLACEMENT_PATTERN.sub(
+        lambda m: TONE_PLACEMENT_MAP[m.group(0)], text_str
+    )
+    text_str = REPEATED_CHAR_PATTERN.sub(r"\1", text_str)
+    text_str = WHITESPACE_PATTERN.sub(" ", text_str).strip()
+    if re.search(r"[a-zà-ỹ0-9]", text_str):
+        text_str = strip_trailing_emoji(text_str)
+    return text_str
+
+
+def collapse_duplicate_comments(df_comments: pd.DataFrame) -> pd.DataFrame:
+    """Group near-duplicate comments under a shared key and count group sizes."""
+
+    normalized = df_comments["comment"].map(normalize_comment_text)
+    df_comments["comment_key"] = pd.util.hash_array(normalized.to_numpy(dtype=object))
+    df_comments["duplicate_count"] = df_comments.groupby("comment_key")[
+        "comment_key"
+    ].transform("size")
+
+    return df_comments
+
+
 def load_and_clean_comments(df_comments: pd.DataFrame) -> pd.DataFrame:
     """Clean and deduplicate Facebook comments."""
 
@@ -39,10 +90,78 @@ def load_and_clean_comments(df_comments: pd.DataFrame) -> pd.DataFrame:
 
     df_comments["comment"] = df_comments["comment_text"].apply(remove_emojis_from_text)
     df_comments = df_comments.drop(columns=["comment_text"])
+    df_comments = collapse_duplicate_comments(df_comments)
 
     return df_comments
 
 
+SENTIMENT_COLUMN_NAMES = {
+    "Tiêu cực": "negative",
+    "Trung tính": "neutral",
+    "Tích cực": "positive",
+}
+
+
+def build_post_analytics(
+    df_posts: pd.DataFrame,
+    df_comments_with_sentiment: pd.DataFrame,
+    sentiment_column_names: Dict[str, str] = SENTIMENT_COLUMN_NAMES,
+) -> pd.DataFrame:
+    """Build per-post sentiment counts, ratios and engagement metrics in one pass."""
+
+    df_comments = df_comments_with_sentiment[
+        df_comments_with_sentiment["comment"].fillna("").astype(str).str.strip() != ""
+    ]
+    urls = pd.Categorical(df_comments["url"], categories=df_posts["url"].unique())
+    sentiments = pd.Categorical(
+        df_comments["sentiment"], categories=list(sentiment_column_names)
+    )
+
+    counts = (
+        pd.Series(1, index=df_comments.index)
+        .groupby([urls, sentiments], observed=False)
+        .sum()
+        .unstack(fill_value=0)
+        .rename(columns=sentiment_column_names)
+    )
+    counts.index.name = "url"
+    counts.columns.name = None
+    count_columns = list(sentiment_column_names.values())
+
+    df_analytics = df_posts.set_index("url").join(counts, how="left")
+    df_analytics[count_columns] = df_analytics[count_columns].fillna(0).astype(int)
+    df_analytics["scored_comments"] = df_analytics[count_columns].sum(axis=1)
+
+    scored = df_analytics["scored_comments"].to_numpy()
+    for name in count_columns:
+        df_analytics[f"{name}_ratio"] = np.divide(
+            df_analytics[name].to_numpy(),
+            scored,
+            out=np.zeros(len(df_analytics)),
+            where=scored > 0,
+        )
+        df_analytics = df_analytics.rename(columns={name: f"{name}_count"})
+
+    if "negative_count" in df_analytics.columns:
+        total_negative = df_analytics["negative_count"].sum()
+        df_analytics["negative_share"] = (
+            df_analytics["negative_count"] / total_negative if total_negative else 0.0
+        )
+
+    crawled = df_analytics["total_comments_crawled"].fillna(0).to_numpy()
+    df_analytics["engagement_per_comment"] = np.divide(
+        df_analytics["total_engagement"].to_numpy(dtype=float),
+        crawled,
+        out=np.zeros(len(df_analytics)),
+        where=crawled > 0,
+    )
+    df_analytics["engagement_rank"] = (
+        df_analytics["total_engagement"].rank(ascending=False, method="min").astype(int)
+    )
+
+    return df_analytics.reset_index()
+
+
 def run_data_processing(
     df_posts: pd.DataFrame,
     df_comments: pd.DataFrame,
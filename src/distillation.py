@@ -0,0 +1,253 @@
+import argparse
+import copy
+import os
+import random
+import re
+import time
+from contextlib import closing
+from typing import Dict, List
+
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from analytics_store import connect_store
+from sentiment_analysis import (
+    MODEL_TIERS,
+    SENTIMENT_LABELS,
+    CommentDataset,
+    collate_batch,
+    get_model,
+    predict_labels,
+)
+from torch.utils.data import DataLoader
+from transformers import (
+    AutoModelForSequenceClassification,
+    PreTrainedModel,
+    PreTrainedTokenizerBase,
+)
+
+LAYER_KEY_PATTERN = re.compile(r"(encoder\.layer\.)(\d+)(\.)")
+
+
+def load_training_texts(path: str) -> List[str]:
+    """Load unique non-empty comments from a CSV/Parquet file or the analytics store."""
+
+    if path.endswith(".db"):
+        with closing(connect_store(path)) as conn:
+            comments = pd.read_sql_query("SELECT comment FROM comments", conn)[
+                "comment"
+            ]
+    elif path.endswith(".parquet"):
+        comments = pd.read_parquet(path, columns=["comment"])["comment"]
+    else:
+        comments = pd.read_csv(path, usecols=["comment"])["comment"]
+
+    comments = comments.dropna().astype(str).str.strip()
+    return comments[comments != ""].drop_duplicates().tolist()
+
+
+def compute_teacher_logits(
+    texts: List[str],
+    teacher: PreTrainedModel,
+    tokenizer: PreTrainedTokenizerBase,
+    device: torch.device,
+    batch_size: int = 32,
+) -> torch.Tensor:
+    """Run the teacher once over all texts and keep its raw logits as soft labels."""
+
+    dataloader = DataLoader(
+        CommentDataset(texts),
+        batch_size=batch_size,
+        collate_fn=lambda x: collate_batch(x, tokenizer),
+    )
+
+    all_logits = []
+    with torch.no_grad():
+        for batch in dataloader:
+            batch = {k: v.to(device) for k, v in batch.items()}
+            all_logits.append(teacher(**batch).logits.cpu())
+
+    return torch.cat(all_logits)
+
+
+def build_student(teacher: PreTrainedModel, num_layers: int = 4) -> PreTrainedModel:
+    """Create a shallower copy of the teacher initialized from evenly spaced layers."""
+
+    config = copy.deepcopy(teacher.config)
+    teacher_layers = config.num_hidden_layers
+    config.num_hidden_layers = num_layers
+    student = AutoModelForSequenceClassification.from_config(config)
+
+    step = teacher_layers / num_layers
+    kept_layers = {round(i * step + step - 1): i for i in range(num_layers)}
+
+    student_state = {}
+    for key, value in teacher.state_dict().items():
+        match = LAYER_KEY_PATTERN.search(key)
+        if match is None:
+            student_state[key] = value
+        elif int(match.group(2)) in kept_layers:
+            new_index = kept_layers[int(match.group(2))]
+            student_state[LAYER_KEY_PATTERN.sub(rf"\g<1>{new_index}\g<3>", key)] = value
+
+    student.load_state_dict(student_state, strict=False)
+    return student
+
+
+def train_student(
+    student: PreTrainedModel,
+    tokenizer: PreTrainedTokenizerBase,
+    texts: List[str],
+    teacher_logits: torch.Tensor,
+    device: torch.device,
+    epochs: int = 3,
+    batch_size: int = 32,
+    learning_rate: float = 5e-5,
+    temperature: float = 2.0,
+) -> PreTrainedModel:
+    """Train the student to match the teacher's softened output distribution."""
+
+    student.to(device)
+    student.train()
+    optimizer = torch.optim.AdamW(student.parameters(), lr=learning_rate)
+    indices = list(range(len(texts)))
+
+    for epoch in range(1, epochs + 1):
+        random.shuffle(indices)
+        total_loss = 0.0
+
+        for start in range(0, len(indices), batch_size):
+            batch_idx = indices[start : start + batch_size]
+            batch = collate_batch([texts[i] for i in batch_idx], tokenizer)
+            batch = {k: v.to(device) for k, v in batch.items()}
+
+            student_log_probs = F.log_softmax(
+                student(**batch).logits / temperature, dim=-1
+            )
+            teacher_probs = F.softmax(
+                teacher_logits[batch_idx].to(device) / temperature, dim=-1
+            )
+            loss = F.kl_div(student_log_probs, teacher_probs, reduction="batchmean") * (
+                temperature**2
+            )
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(batch_idx)
+
+        print(f"Epoch {epoch}/{epochs} - loss: {total_loss / len(texts):.4f}")
+
+    student.eval()
+    return student
+
+
+def compare_tiers(
+    texts: List[str],
+    base_path: str = MODEL_TIERS["base"]["model_path"],
+    small_path: str = MODEL_TIERS["small"]["model_path"],
+) -> Dict[str, float]:
+    """Measure scoring speed of both tiers and how often their labels agree."""
+
+    report = {}
+    predictions = {}
+    for tier, path in [("base", base_path), ("small", small_path)]:
+        tokenizer, model, device = get_model(path, MODEL_TIERS[tier]["quantize"])
+        started = time.perf_counter()
+        predictions[tier] = predict_labels(
+            texts, model, tokenizer, device, SENTIMENT_LABELS, batch_size=32
+        )
+        elapsed = time.perf_counter() - started
+        report[f"{tier}_comments_per_s"] = round(len(texts) / elapsed, 1)
+
+    agreement = sum(
+        base == small for base, small in zip(predictions["base"], predictions["small"])
+    )
+    report["speedup"] = round(
+        report["small_comments_per_s"] / report["base_comments_per_s"], 2
+    )
+    report["label_agreement"] = round(agreement / max(len(texts), 1), 4)
+    return report
+
+
+def run_distillation(
+    input_path: str,
+    output_path: str = MODEL_TIERS["small"]["model_path"],
+    teacher_path: str = MODEL_TIERS["base"]["model_path"],
+    num_layers: int = 4,
+    epochs: int = 3,
+    batch_size: int = 32,
+    temperature: float = 2.0,
+    holdout: float = 0.1,
+) -> Dict[str, float]:
+    """Distill the teacher into a small student, save it and report speed vs agreement."""
+
+    texts = load_training_texts(input_path)
+    if len(texts) < 10:
+        raise ValueError("Cần ít nhất 10 bình luận để huấn luyện mô hình nhỏ.")
+
+    random.shuffle(texts)
+    n_holdout = max(1, int(len(texts) * holdout))
+    train_texts, eval_texts = texts[n_holdout:], texts[:n_holdout]
+    print(f"Distilling on {len(train_texts)} comments, evaluating on {n_holdout}...")
+
+    tokenizer, teacher, device = get_model(teacher_path)
+    teacher_logits = compute_teacher_logits(
+        train_texts, teacher, tokenizer, device, batch_size=batch_size
+    )
+
+    student = build_student(teacher, num_layers)
+    student = train_student(
+        student,
+        tokenizer,
+        train_texts,
+        teacher_logits,
+        device,
+        epochs=epochs,
+        batch_size=batch_size,
+        temperature=temperature,
+    )
+
+    os.makedirs(output_path, exist_ok=True)
+    student.save_pretrained(output_path)
+    tokenizer.save_pretrained(output_path)
+    print(f"Student model saved to {output_path}")
+
+    return compare_tiers(eval_texts, teacher_path, output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Distill the sentiment model into a faster student model."
+    )
+    parser.add_argument(
+        "--input",
+        default="data/analytics.db",
+        help="Comments to learn from: analytics .db, .csv or .parquet",
+    )
+    parser.add_argument("--output", default=MODEL_TIERS["small"]["model_path"])
+    parser.add_argument("--teacher", default=MODEL_TIERS["base"]["model_path"])
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument(
+        "--temperature", type=float, default=2.0, help="Softmax temperature"
+    )
+    args = parser.parse_args()
+
+    report = run_distillation(
+        args.input,
+        args.output,
+        args.teacher,
+        num_layers=args.layers,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        temperature=args.temperature,
+    )
+    print("\nSo sánh mô hình:")
+    for key, value in report.items():
+        print(f"   - {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
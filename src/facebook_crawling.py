@@ -6,11 +6,28 @@ import time
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
-from playwright.sync_api import Browser, BrowserContext, Page, sync_playwright
+from playwright.sync_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+)
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import sync_playwright
 
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
+# Time budgets in seconds for each phase of crawling a single post
+PHASE_BUDGETS = {
+    "load": 30,
+    "metrics": 5,
+    "scroll": 240,
+    "extract": 60,
+}
+MAX_LOAD_RETRIES = 2
+RETRY_BACKOFF = 2
+
 
 def setup_browser_context(browser: Browser) -> BrowserContext:
     """Create a browser context with custom viewport and user-agent."""
@@ -22,6 +39,24 @@ def setup_browser_context(browser: Browser) -> BrowserContext:
     return context
 
 
+def launch_browser(p: Playwright) -> Browser:
+    """Launch a headless Chromium instance for crawling."""
+
+    return p.chromium.launch(
+        headless=True,
+        args=["--no-sandbox", "--disable-blink-features=AutomationControlled"],
+    )
+
+
+def new_crawl_page(browser: Browser) -> Page:
+    """Open a new page in a fresh crawling context that auto-accepts dialogs."""
+
+    context = setup_browser_context(browser)
+    page = context.new_page()
+    page.on("dialog", lambda dialog: dialog.accept())
+    return page
+
+
 def wait_for_page_load(page: Page, timeout: int = 10) -> None:
     """Wait until the page finishes loading."""
 
@@ -33,111 +68,170 @@ def wait_for_page_load(page: Page, timeout: int = 10) -> None:
         time.sleep(2)
 
 
+NUMBER_PATTERN = re.compile(
+    r"(\d+(?:[.,]\d+)*)\s*(nghìn|ngàn|triệu|tr|k|n|m)?(?![a-zà-ỹ])", re.IGNORECASE
+)
+THOUSANDS_GROUP_PATTERN = re.compile(r"\d{1,3}(?:[.,]\d{3})+")
+UNIT_MULTIPLIERS = {
+    "k": 1_000,
+    "n": 1_000,
+    "nghìn": 1_000,
+    "ngàn": 1_000,
+    "m": 1_000_000,
+    "tr": 1_000_000,
+    "triệu": 1_000_000,
+}
+
+# Collects every post field in a single round trip to the page
+POST_SNAPSHOT_SCRIPT = """
+() => {
+    const isVisible = (el) => !!el && el.getClientRects().length > 0
+        && getComputedStyle(el).visibility !== "hidden";
+    const textOf = (el) => (el ? el.innerText.trim() : "");
+    const firstVisibleText = (selector, pattern) => {
+        const matches = (text) => pattern.test(text) && /\\d/.test(text);
+        for (const el of document.querySelectorAll(selector)) {
+            // textContent needs no layout, so style reads only hit candidates
+            if (!matches(el.textContent.trim()) || !isVisible(el)) continue;
+            const text = textOf(el);
+            if (matches(text)) return text;
+        }
+        return "";
+    };
+
+    const reactionEl = document.querySelector('span[aria-hidden="true"] span span');
+    const contentEl = document.querySelector('[data-ad-preview="message"]');
+    const authorEl = document.querySelector(
+        'div[data-ad-rendering-role="profile_name"] h3 a[role="link"]'
+    );
+
+    return {
+        reactions: isVisible(reactionEl) ? textOf(reactionEl) : "",
+        comments:
+            firstVisibleText("span", /comments/i)
+            || firstVisibleText("span", /bình luận/i),
+        shares: firstVisibleText(
+            "span.html-span",
+            /\\d[\\d,.]*\\s*\\S*\\s+(shares|chia sẻ|lượt chia sẻ)$/i
+        ),
+        author: textOf(authorEl),
+        content: isVisible(contentEl) ? textOf(contentEl) : "",
+    };
+}
+"""
+
+# Comment text with tagged people written as @First_Last so they can be told
+# apart from the message; hashtags and outbound links are left as they are
+COMMENT_TEXT_SCRIPT = """
+(el) => {
+    let text = el.innerText;
+    for (const a of el.querySelectorAll("a[href]")) {
+        const name = a.innerText.trim();
+        if (!name || a.href.includes("/hashtag/") || a.href.includes("l.facebook.com")) {
+            continue;
+        }
+        text = text.replace(name, "@" + name.replace(/\\s+/g, "_"));
+    }
+    return text;
+}
+"""
+
+
 def parse_facebook_number(num_str: str) -> int:
-    num_str = num_str.lower().replace(",", "").strip()
-    if "k" in num_str:
-        return int(float(num_str.replace("k", "")) * 1_000)
-    elif "m" in num_str:
-        return int(float(num_str.replace("m", "")) * 1_000_000)
-    return int(re.findall(r"\d+", num_str)[0])
+    """Parse a Facebook count such as "1.234", "1,2K", "3 tr" or "2,5 nghìn"."""
 
+    match = NUMBER_PATTERN.search(num_str.strip())
+    if not match:
+        return 0
 
-def extract_engagement_metrics(page: Page) -> Dict[str, int]:
-    """Extract reaction, comment, and share counts from the post."""
+    number, unit = match.group(1), (match.group(2) or "").lower()
+    is_decimal = unit and number.count(",") + number.count(".") == 1
 
-    metrics = {
-        "reactions_count": 0,
-        "comments_count": 0,
-        "shares_count": 0,
-    }
+    if not is_decimal and THOUSANDS_GROUP_PATTERN.fullmatch(number):
+        value = float(number.replace(",", "").replace(".", ""))
+    else:
+        value = float(number.replace(",", "."))
 
-    reaction_selectors = ['span[aria-hidden="true"] span span']
-    comment_selectors = ['span:has-text("comments")', 'span:has-text("bình luận")']
+    return int(round(value * UNIT_MULTIPLIERS.get(unit, 1)))
 
-    def extract_from_selectors(selectors, metric_key):
-        for selector in selectors:
-            try:
-                element = page.locator(selector).first
-                if element.is_visible():
-                    text = element.inner_text(timeout=1000).strip().lower()
-                    match = re.search(r"\d[\d,.]*[kKmM]?", text)
-                    if match:
-                        val = parse_facebook_number(match.group(0))
-                        metrics[metric_key] = max(metrics[metric_key], val)
-                        break
-            except Exception:
-                continue
+
+def extract_post_snapshot(
+    page: Page, wait_timeout: float = PHASE_BUDGETS["metrics"]
+) -> Dict[str, Any]:
+    """Extract author, content and engagement counts with one in-page script."""
 
     try:
-        page.wait_for_selector(reaction_selectors[0], timeout=15000)
+        page.wait_for_selector(
+            'span[aria-hidden="true"] span span', timeout=wait_timeout * 1000
+        )
     except Exception:
         pass
-    extract_from_selectors(reaction_selectors, "reactions_count")
 
-    extract_from_selectors(comment_selectors, "comments_count")
+    raw = page.evaluate(POST_SNAPSHOT_SCRIPT)
 
-    possible_share_spans = page.locator(
-        'span.html-span:has-text("share"), span.html-span:has-text("lượt chia sẻ")'
-    )
-    for element in possible_share_spans.all():
-        try:
-            if element.is_visible():
-                text = element.inner_text(timeout=1000).strip().lower()
-                if re.search(r"\d[\d,.]*\s+(shares|chia sẻ|lượt chia sẻ)$", text):
-                    match = re.search(r"\d[\d,.]*[kKmM]?", text)
-                    if match:
-                        val = parse_facebook_number(match.group(0))
-                        metrics["shares_count"] = max(metrics["shares_count"], val)
-                        break
-        except Exception:
-            continue
+    return {
+        "author": raw["author"],
+        "content": raw["content"],
+        "reactions_count": parse_facebook_number(raw["reactions"]),
+        "comments_count": parse_facebook_number(raw["comments"]),
+        "shares_count": parse_facebook_number(raw["shares"]),
+    }
 
-    return metrics
 
+def scroll_comments(page: Page, scroll_budget: float = PHASE_BUDGETS["scroll"]) -> bool:
+    """Scroll the comment list until no more load, returning False on a timeout."""
 
-def extract_post_content(page: Page) -> str:
-    """Extract main text content of the Facebook post."""
+    scrollable_container = page.locator(
+        "div.xb57i2i.x1q594ok.x5lxg6s.x78zum5.xdt5ytf.x6ikm8r.x1ja2u2z.x1pq812k.x1rohswg"
+        ".xfk6m8.x1yqm8si.xjx87ck.xx8ngbg.xwo3gff.x1n2onr6.x1oyok0e.x1odjw0f.x1iyjqo2.xy5w88m"
+    ).first
 
     try:
-        element = page.locator('[data-ad-preview="message"]').first
-        if element.is_visible():
-            content = element.inner_text(timeout=3000)
-            if content and len(content) > 0:
-                return content.strip()
-    except Exception:
-        pass
-    return ""
+        if scrollable_container.count() == 0:
+            # Posts with few comments show them all without a scroll container
+            return True
 
+        previous_height = scrollable_container.evaluate("(el) => el.scrollHeight")
+        scroll_deadline = time.monotonic() + scroll_budget
 
-def extract_post_metadata(page: Page) -> Dict[str, str]:
-    """Extract post metadata like author name."""
+        for _ in range(1000):
+            if time.monotonic() > scroll_deadline:
+                print("Scroll time budget exceeded, keeping loaded comments.")
+                return False
 
-    metadata = {"author": ""}
+            scrollable_container.evaluate("(el) => el.scrollBy(0, 1500)")
+            time.sleep(random.uniform(1, 2))
 
-    try:
-        author_selectors = [
-            'div[data-ad-rendering-role="profile_name"] h3 a[role="link"]'
-        ]
+            current_height = scrollable_container.evaluate("(el) => el.scrollHeight")
+            if current_height == previous_height:
+                scrollable_container.evaluate("(el) => el.scrollBy(0, 2500)")
+                time.sleep(random.uniform(1, 2))
 
-        for selector in author_selectors:
-            try:
-                author_elem = page.locator(selector).first
-                if author_elem.count() > 0:
-                    metadata["author"] = author_elem.inner_text()
+                current_height = scrollable_container.evaluate(
+                    "(el) => el.scrollHeight"
+                )
+                if current_height == previous_height:
                     break
-            except Exception:
-                continue
 
+            previous_height = current_height
+    except PlaywrightTimeoutError as e:
+        print(f"Scroll timed out: {e}")
+        return False
     except Exception as e:
-        print(f"Error extracting metadata: {e}")
+        print(f"Scroll error: {e}")
 
-    return metadata
+    return True
 
 
-def extract_comments(page: Page) -> List[Dict[str, str]]:
-    """Extract visible comments from the post area."""
+def extract_comments(
+    page: Page,
+    scroll_budget: float = PHASE_BUDGETS["scroll"],
+    extract_budget: float = PHASE_BUDGETS["extract"],
+) -> Tuple[List[Dict[str, str]], bool]:
+    """Extract visible comments and report whether all of them were collected."""
 
     comments = []
+    complete = True
 
     try:
         # Click the "Most relevant" button
@@ -161,44 +255,24 @@ def extract_comments(page: Page) -> List[Dict[str, str]]:
             print("Could not find or click 'All comments'.")
 
         # Scroll down to load all comments
-        try:
-            scrollable_container = page.locator(
-                "div.xb57i2i.x1q594ok.x5lxg6s.x78zum5.xdt5ytf.x6ikm8r.x1ja2u2z.x1pq812k.x1rohswg"
-                ".xfk6m8.x1yqm8si.xjx87ck.xx8ngbg.xwo3gff.x1n2onr6.x1oyok0e.x1odjw0f.x1iyjqo2.xy5w88m"
-            ).first
-            previous_height = scrollable_container.evaluate("(el) => el.scrollHeight")
-
-            for _ in range(1000):
-                scrollable_container.evaluate("(el) => el.scrollBy(0, 1500)")
-                time.sleep(random.uniform(1, 2))
-
-                current_height = scrollable_container.evaluate(
-                    "(el) => el.scrollHeight"
-                )
-                if current_height == previous_height:
-                    scrollable_container.evaluate("(el) => el.scrollBy(0, 2500)")
-                    time.sleep(random.uniform(1, 2))
-
-                    current_height = scrollable_container.evaluate(
-                        "(el) => el.scrollHeight"
-                    )
-                    if current_height == previous_height:
-                        break
-
-                previous_height = current_height
-        except Exception as e:
-            print(f"Scroll error: {e}")
+        complete = scroll_comments(page, scroll_budget)
 
         # Extract comments
         comment_elements = page.locator(
             "div.html-div.xdj266r.x14z9mp.xat24cr.x1lziwak.xexx8yu.x18d9i69.x1g0dm76.xpdmqnj.x1n2onr6 "
             'div[dir="auto"][style="text-align: start;"]'
         ).all()
+        extract_deadline = time.monotonic() + extract_budget
 
         for el in comment_elements:
+            if time.monotonic() > extract_deadline:
+                print("Extraction time budget exceeded, keeping parsed comments.")
+                complete = False
+                break
+
             try:
                 # Extract main text
-                comment_text = el.inner_text().strip()
+                comment_text = el.evaluate(COMMENT_TEXT_SCRIPT).strip()
 
                 # Add emojis (if any)
                 emojis = el.locator("img[alt]").all()
@@ -219,40 +293,75 @@ def extract_comments(page: Page) -> List[Dict[str, str]]:
 
     except Exception as e:
         print(f"Error extracting comments: {e}")
+        complete = False
+
+    return comments, complete
+
 
-    return comments
+def goto_with_retries(
+    page: Page,
+    url: str,
+    max_retries: int = MAX_LOAD_RETRIES,
+    timeout: float = PHASE_BUDGETS["load"],
+) -> None:
+    """Open the URL, retrying with exponential backoff on failure."""
+
+    for attempt in range(max_retries + 1):
+        try:
+            page.goto(url, timeout=timeout * 1000)
+            return
+        except Exception:
+            if attempt == max_retries:
+                raise
+            delay = RETRY_BACKOFF * 2**attempt + random.uniform(0, 1)
+            print(f"Retrying {url} in {delay:.1f}s ({attempt + 1}/{max_retries})...")
+            time.sleep(delay)
 
 
 def crawl_facebook_post(page: Page, url: str) -> Dict[str, Any]:
     """Crawl all post data including content, metadata, and comments."""
 
     try:
-        page.goto(url, timeout=30000)
+        goto_with_retries(page, url)
         wait_for_page_load(page)
-
-        # Extract data
-        content = extract_post_content(page)
-        metadata = extract_post_metadata(page)
-        metrics = extract_engagement_metrics(page)
-        comments = extract_comments(page)
-
-        result = {
-            "url": url,
-            "author": metadata["author"],
-            "content": content,
-            "reactions_count": metrics["reactions_count"],
-            "comments_count": metrics["comments_count"],
-            "shares_count": metrics["shares_count"],
-            "comments": comments,
-        }
-
-        return result
-
     except Exception:
         raise RuntimeError(
             f"Không thể thu thập dữ liệu từ liên kết: {url}. Vui lòng kiểm tra lại liên kết hoặc thử lại sau."
         )
 
+    # Extract data, keeping whatever was collected if a phase fails
+    complete = True
+    snapshot = {
+        "author": "",
+        "content": "",
+        "reactions_count": 0,
+        "comments_count": 0,
+        "shares_count": 0,
+    }
+    comments = []
+
+    try:
+        snapshot = extract_post_snapshot(page)
+    except Exception as e:
+        print(f"Error extracting post details from {url}: {e}")
+        complete = False
+
+    try:
+        comments, comments_complete = extract_comments(page)
+        complete = complete and comments_complete
+    except Exception as e:
+        print(f"Error extracting comments from {url}: {e}")
+        complete = False
+
+    result = {
+        "url": url,
+        **snapshot,
+        "comments": comments,
+        "is_complete": complete,
+    }
+
+    return result
+
 
 def check_post_links(post_links: Optional[List[str]] = None) -> bool:
     """Validate the format of Facebook post URLs."""
@@ -269,6 +378,34 @@ def check_post_links(post_links: Optional[List[str]] = None) -> bool:
     return True
 
 
+def build_post_records(
+    data: Dict[str, Any],
+) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+    """Split crawled post data into a post summary row and its comment rows."""
+
+    post_summary = {
+        "url": data["url"],
+        "author": data["author"],
+        "content": data["content"],
+        "reactions_count": data["reactions_count"],
+        "comments_count": data["comments_count"],
+        "shares_count": data["shares_count"],
+        "total_comments_crawled": len(data["comments"]),
+        "is_complete": data.get("is_complete", True),
+    }
+
+    comments = data.get("comments")
+
+    if isinstance(comments, list) and comments:
+        comment_rows = [
+            {"url": data["url"], "comment_text": c["comments_text"]} for c in comments
+        ]
+    else:
+        comment_rows = [{"url": data["url"], "comment_text": ""}]
+
+    return post_summary, comment_rows
+
+
 def run_facebook_crawling(
     post_links: Optional[List[str]] = None,
     on_progress: Optional[Callable[[int, int], None]] = None,
@@ -286,14 +423,9 @@ def run_facebook_crawling(
     all_comments = []
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,
-            args=["--no-sandbox", "--disable-blink-features=AutomationControlled"],
-        )
+        browser = launch_browser(p)
         try:
-            context = setup_browser_context(browser)
-            page = context.new_page()
-            page.on("dialog", lambda dialog: dialog.accept())
+            page = new_crawl_page(browser)
 
             for i, url in enumerate(post_links, 1):
                 try:
@@ -302,29 +434,9 @@ def run_facebook_crawling(
                     print(str(e))
                     continue
 
-                posts_summary.append(
-                    {
-                        "url": data["url"],
-                        "author": data["author"],
-                        "content": data["content"],
-                        "reactions_count": data["reactions_count"],
-                        "comments_count": data["comments_count"],
-                        "shares_count": data["shares_count"],
-                        "total_comments_crawled": len(data["comments"]),
-                    }
-                )
-
-                comments = data.get("comments")
-
-                if isinstance(comments, list) and comments:
-                    all_comments.extend(
-                        [
-                            {"url": data["url"], "comment_text": c["comments_text"]}
-                            for c in comments
-                        ]
-                    )
-                else:
-                    all_comments.append({"url": data["url"], "comment_text": ""})
+                post_summary, comment_rows = build_post_records(data)
+                posts_summary.append(post_summary)
+                all_comments.extend(comment_rows)
 
                 if on_progress:
                     on_progress(i, len(post_links))
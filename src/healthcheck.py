@@ -0,0 +1,35 @@
+import os
+import sys
+import urllib.request
+
+HEALTH_URL = "http://localhost:8501/_stcore/health"
+MODEL_CONFIG = "models/bert_sentiment_vietnamese/config.json"
+
+
+def main() -> int:
+    """Return 0 when the server answers and the baked-in model is loaded and warm."""
+
+    try:
+        with urllib.request.urlopen(HEALTH_URL, timeout=5) as response:
+            if response.status != 200:
+                print(f"Streamlit health check returned {response.status}")
+                return 1
+    except Exception as e:
+        print(f"Streamlit is not reachable: {e}")
+        return 1
+
+    if not os.path.exists(MODEL_CONFIG):
+        print(f"Model files not found: {MODEL_CONFIG}")
+        return 1
+
+    marker_path = os.getenv("WARMUP_MARKER_FILE")
+    if not marker_path or not os.path.exists(marker_path):
+        print("Model is still warming up")
+        return 1
+
+    print("ok (model warm)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import argparse
+import json
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+from sentiment_analysis import (
+    SENTIMENT_LABELS,
+    gate_comment,
+    get_model,
+    predict_labels,
+)
+
+MAX_TEXTS_PER_REQUEST = 256
+REQUEST_TIMEOUT = 30
+
+
+class ServerBusyError(Exception):
+    """Raised when the request queue is full and new work must be rejected."""
+
+
+class MicroBatcher:
+    """Coalesce concurrent prediction requests into batches for one shared model."""
+
+    def __init__(
+        self,
+        model_path: str = "models/bert_sentiment_vietnamese",
+        max_batch_size: int = 64,
+        max_wait_ms: float = 10,
+        max_queue_size: int = 1024,
+    ):
+        self.tokenizer, self.model, self.device = get_model(model_path)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests: queue.Queue = queue.Queue(maxsize=max_queue_size)
+
+        self.started_at = time.monotonic()
+        self.stats_lock = threading.Lock()
+        self.latencies = deque(maxlen=1000)
+        self.n_requests = 0
+        self.n_texts = 0
+        self.n_batches = 0
+        self.n_rejected = 0
+        self.n_timed_out = 0
+
+        self.worker = threading.Thread(target=self._run, name="batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, texts: List[str]) -> List[str]:
+        """Label texts by rules, queue the rest for scoring and wait for their labels."""
+
+        gated = [gate_comment(text, SENTIMENT_LABELS) for text in texts]
+        labels = [label for label, _ in gated]
+        model_idx = [i for i, (label, _) in enumerate(gated) if label is None]
+        if not model_idx:
+            return labels
+
+        future: Future = Future()
+        try:
+            self.requests.put_nowait(
+                ([texts[i] for i in model_idx], future, time.monotonic())
+            )
+        except queue.Full:
+            with self.stats_lock:
+                self.n_rejected += 1
+            raise ServerBusyError("Hàng đợi đang đầy. Vui lòng thử lại sau.")
+
+        try:
+            predicted = future.result(timeout=REQUEST_TIMEOUT)
+        except FutureTimeoutError:
+            # Not yet picked up by the worker: drop it instead of scoring it later
+            future.cancel()
+            with self.stats_lock:
+                self.n_timed_out += 1
+            raise
+
+        for i, label in zip(model_idx, predicted):
+            labels[i] = label
+        return labels
+
+    def _collect_batch(self) -> List[Tuple[List[str], Future, float]]:
+        """Wait for one request, then gather more until the batch or wait window is full."""
+
+        batch = [self.requests.get()]
+        n_texts = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+
+        while n_texts < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_texts += len(item[0])
+
+        return batch
+
+    def _run(self) -> None:
+        """Score batches of queued requests forever."""
+
+        while True:
+            batch = [
+                item
+                for item in self._collect_batch()
+                if item[1].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            texts = [text for request_texts, _, _ in batch for text in request_texts]
+
+            try:
+                labels = predict_labels(
+                    texts,
+                    self.model,
+                    self.tokenizer,
+                    self.device,
+                    SENTIMENT_LABELS,
+                    batch_size=self.max_batch_size,
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished_at = time.monotonic()
+            offset = 0
+            for request_texts, future, _ in batch:
+                future.set_result(labels[offset : offset + len(request_texts)])
+                offset += len(request_texts)
+
+            with self.stats_lock:
+                self.latencies.extend(
+                    finished_at - queued_at for _, _, queued_at in batch
+                )
+                self.n_requests += len(batch)
+                self.n_texts += len(texts)
+                self.n_batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return latency and throughput statistics since the server started."""
+
+        with self.stats_lock:
+            latencies_ms = sorted(latency * 1000 for latency in self.latencies)
+            n_requests, n_texts = self.n_requests, self.n_texts
+            n_batches, n_rejected = self.n_batches, self.n_rejected
+            n_timed_out = self.n_timed_out
+
+        uptime = time.monotonic() - self.started_at
+        p50 = p95 = None
+        if latencies_ms:
+            p50 = round(statistics.median(latencies_ms), 1)
+            p95 = round(latencies_ms[int(0.95 * (len(latencies_ms) - 1))], 1)
+
+        return {
+            "uptime_s": round(uptime, 1),
+            "requests": n_requests,
+            "texts": n_texts,
+            "batches": n_batches,
+            "rejected": n_rejected,
+            "timed_out": n_timed_out,
+            "queue_depth": self.requests.qsize(),
+            "avg_batch_size": round(n_texts / n_batches, 2) if n_batches else 0,
+            "throughput_texts_per_s": round(n_texts / uptime, 2),
+            "latency_ms_p50": p50,
+            "latency_ms_p95": p95,
+        }
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for concurrent clients."""
+
+    request_queue_size = 128
+
+
+def make_handler(batcher: MicroBatcher) -> type:
+    """Build a request handler class bound to the given batcher."""
+
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send_json(200, batcher.stats())
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self) -> None:
+            if self.path != "/predict":
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                texts = payload.get("texts", [])
+                if not isinstance(texts, list):
+                    raise ValueError
+                texts = ["" if text is None else str(text) for text in texts]
+            except (ValueError, AttributeError):
+                self._send_json(400, {"error": 'Body phải có dạng {"texts": [...]}'})
+                return
+
+            if len(texts) > MAX_TEXTS_PER_REQUEST:
+                self._send_json(
+                    413, {"error": f"Tối đa {MAX_TEXTS_PER_REQUEST} câu mỗi request."}
+                )
+                return
+
+            try:
+                labels = batcher.submit(texts) if texts else []
+            except ServerBusyError as e:
+                self._send_json(503, {"error": str(e)})
+                return
+            except FutureTimeoutError:
+                self._send_json(504, {"error": "Quá thời gian chờ phân tích cảm xúc."})
+                return
+            except Exception:
+                self._send_json(500, {"error": "Đã xảy ra lỗi khi phân tích cảm xúc."})
+                return
+
+            self._send_json(200, {"labels": labels})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return InferenceHandler
+
+
+def run_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    model_path: str = "models/bert_sentiment_vietnamese",
+    max_batch_size: int = 64,
+    max_wait_ms: float = 10,
+    max_queue_size: int = 1024,
+) -> None:
+    """Load the model once and serve predictions over HTTP."""
+
+    print("Loading model...")
+    batcher = MicroBatcher(model_path, max_batch_size, max_wait_ms, max_queue_size)
+    server = InferenceHTTPServer((host, port), make_handler(batcher))
+    print(f"Inference server listening on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the sentiment model over HTTP with micro-batching."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model-path", default="models/bert_sentiment_vietnamese")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--max-queue-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    run_server(
+        args.host,
+        args.port,
+        args.model_path,
+        args.max_batch_size,
+        args.max_wait_ms,
+        args.max_queue_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+@dataclass
+class KeywordSentimentIndex:
+    """Sparse keyword, post and snapshot sentiment counts built from segmented comments."""
+
+    vocabulary: np.ndarray
+    labels: np.ndarray
+    posts: np.ndarray
+    snapshots: np.ndarray
+    keyword_counts: sparse.csr_matrix
+    post_counts: sparse.csr_matrix
+    keyword_trend: sparse.csr_matrix
+
+    def top_keywords(
+        self, sentiment: str, min_count: int = 5, n: int = 20
+    ) -> pd.DataFrame:
+        """Return the keywords most associated with a sentiment, ranked by lift."""
+
+        label_idx = int(np.flatnonzero(self.labels == sentiment)[0])
+        totals = np.asarray(self.keyword_counts.sum(axis=1)).ravel()
+        matches = self.keyword_counts[:, label_idx].toarray().ravel()
+
+        label_totals = np.asarray(self.post_counts.sum(axis=0)).ravel()
+        label_share = label_totals[label_idx] / max(label_totals.sum(), 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.where(totals > 0, matches / totals, 0.0)
+            lift = share / label_share if label_share else np.zeros_like(share)
+
+        df = pd.DataFrame(
+            {
+                "keyword": self.vocabulary,
+                "count": totals,
+                sentiment: matches,
+                "share": share,
+                "lift": lift,
+            }
+        )
+        df = df[(df["count"] >= min_count) & (df[sentiment] > 0)]
+        return df.sort_values(["lift", "count"], ascending=False).head(n)
+
+    def trend(self, keyword: str) -> pd.DataFrame:
+        """Return the sentiment counts of a keyword for each snapshot."""
+
+        keyword_idx = int(np.flatnonzero(self.vocabulary == keyword)[0])
+        counts = (
+            self.keyword_trend[keyword_idx]
+            .toarray()
+            .reshape(len(self.snapshots), len(self.labels))
+        )
+        return pd.DataFrame(counts, index=self.snapshots, columns=self.labels)
+
+    def save(self, path: str) -> None:
+        """Write the index to a compressed .npz file."""
+
+        arrays = {
+            "vocabulary": self.vocabulary,
+            "labels": self.labels,
+            "posts": self.posts,
+            "snapshots": self.snapshots,
+        }
+        for name in ["keyword_counts", "post_counts", "keyword_trend"]:
+            matrix = getattr(self, name)
+            arrays[f"{name}_data"] = matrix.data
+            arrays[f"{name}_indices"] = matrix.indices
+            arrays[f"{name}_indptr"] = matrix.indptr
+            arrays[f"{name}_shape"] = np.array(matrix.shape)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordSentimentIndex":
+        """Read an index previously written with save."""
+
+        with np.load(path) as f:
+            matrices = {
+                name: sparse.csr_matrix(
+                    (f[f"{name}_data"], f[f"{name}_indices"], f[f"{name}_indptr"]),
+                    shape=tuple(f[f"{name}_shape"]),
+                )
+                for name in ["keyword_counts", "post_counts", "keyword_trend"]
+            }
+            return cls(
+                vocabulary=f["vocabulary"],
+                labels=f["labels"],
+                posts=f["posts"],
+                snapshots=f["snapshots"],
+                **matrices,
+            )
+
+
+def one_hot(
+    codes: np.ndarray, n_columns: int, weights: Optional[np.ndarray] = None
+) -> sparse.csr_matrix:
+    """Build a sparse one-hot matrix with one row per code, dropping zero weights."""
+
+    if weights is None:
+        weights = np.ones(len(codes), dtype=np.int32)
+    matrix = sparse.csr_matrix(
+        (weights.astype(np.int32), (np.arange(len(codes)), codes)),
+        shape=(len(codes), n_columns),
+    )
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def build_keyword_index(
+    df_comments_with_sentiment: pd.DataFrame,
+    segmented_comments: pd.Series,
+    labels: Optional[List[str]] = None,
+    snapshot_column: str = "analyzed_at",
+) -> KeywordSentimentIndex:
+    """Count keyword, post and snapshot sentiment co-occurrences in one sparse pass."""
+
+    df = df_comments_with_sentiment.reset_index(drop=True)
+    n_docs = len(df)
+
+    sentiments = pd.Categorical(df["sentiment"], categories=labels)
+    posts = pd.Categorical(df["url"])
+    if snapshot_column in df.columns:
+        snapshots = pd.Categorical(df[snapshot_column].astype(str))
+    else:
+        snapshots = pd.Categorical(["all"] * n_docs)
+
+    # Document-term presence matrix from the stopword-filtered tokens
+    tokens = (
+        pd.Series(segmented_comments.to_numpy(), index=np.arange(n_docs))
+        .str.split()
+        .explode()
+        .dropna()
+    )
+    term_codes, vocabulary = pd.factorize(tokens, sort=True)
+    doc_term = sparse.csr_matrix(
+        (np.ones(len(term_codes), dtype=np.int32), (tokens.index, term_codes)),
+        shape=(n_docs, len(vocabulary)),
+    )
+    doc_term.sum_duplicates()
+    doc_term.data[:] = 1
+
+    n_labels = len(sentiments.categories)
+    valid = sentiments.codes >= 0
+    sentiment_codes = np.where(valid, sentiments.codes, 0)
+    doc_sentiment = one_hot(sentiment_codes, n_labels, weights=valid)
+    doc_snapshot_sentiment = one_hot(
+        snapshots.codes * n_labels + sentiment_codes,
+        len(snapshots.categories) * n_labels,
+        weights=valid,
+    )
+
+    return KeywordSentimentIndex(
+        vocabulary=np.asarray(vocabulary, dtype=str),
+        labels=np.asarray(sentiments.categories, dtype=str),
+        posts=np.asarray(posts.categories, dtype=str),
+        snapshots=np.asarray(snapshots.categories, dtype=str),
+        keyword_counts=(doc_term.T @ doc_sentiment).tocsr(),
+        post_counts=(
+            one_hot(posts.codes, len(posts.categories)).T @ doc_sentiment
+        ).tocsr(),
+        keyword_trend=(doc_term.T @ doc_snapshot_sentiment).tocsr(),
+    )
@@ -1,7 +1,16 @@
+import argparse
+import glob
+import json
 import os
-from typing import List, Tuple
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import emoji
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import torch
 from torch.utils.data import DataLoader, Dataset
 from transformers import (
@@ -11,6 +20,58 @@ from transformers import (
     PreTrainedTokenizerBase,
 )
 
+SENTIMENT_LABELS = ["Tiêu cực", "Trung tính", "Tích cực"]
+
+# "small" is the distilled student built with src/distillation.py
+MODEL_TIERS = {
+    "base": {"model_path": "models/bert_sentiment_vietnamese", "quantize": False},
+    "small": {"model_path": "models/bert_sentiment_vietnamese_small", "quantize": True},
+}
+
+# Polarity of emoji commonly left as Facebook reactions in comments
+EMOJI_POLARITY = {
+    "😍": 1, "🥰": 1, "😘": 1, "❤️": 1, "❤": 1, "💕": 1, "💖": 1, "💗": 1,
+    "💯": 1, "👍": 1, "👏": 1, "🙏": 1, "😊": 1, "😁": 1, "😀": 1, "😃": 1,
+    "😄": 1, "😆": 1, "🤩": 1, "🔥": 1, "🎉": 1, "🥳": 1, "👌": 1, "💪": 1,
+    "😡": -1, "😠": -1, "🤬": -1, "😤": -1, "👎": -1, "😞": -1, "😢": -1,
+    "😭": -1, "💔": -1, "🙄": -1, "😒": -1, "😩": -1, "😫": -1, "🤮": -1,
+    "🤢": -1, "😓": -1, "😔": -1, "😕": -1, "☹️": -1, "🙁": -1,
+}  # fmt: skip
+MENTION_URL_PATTERN = re.compile(r"@\S+|https?://\S+|www\.\S+")
+# Basic Latin, Latin-1 (without × and ÷), Latin Extended-A/B and Additional
+LATIN_LETTER_PATTERN = re.compile(
+    r"[a-zA-Z\u00C0-\u00D6\u00D8-\u00F6\u00F8-\u024F\u1E00-\u1EFF]"
+)
+WORD_CHAR_PATTERN = re.compile(r"[^\W\d_]")
+
+
+def gate_comment(text: str, labels: List[str]) -> Tuple[Optional[str], str]:
+    """Label empty, emoji-only, tag/link-only or non-Latin comments by rules."""
+
+    # Source is "model" when the label is left to the model (label is None)
+    negative, neutral, positive = labels
+    text = text.strip()
+    if not text:
+        return neutral, "skipped"
+
+    emojis = [item["emoji"] for item in emoji.emoji_list(text)]
+    remainder = MENTION_URL_PATTERN.sub("", emoji.replace_emoji(text, replace=""))
+
+    if not WORD_CHAR_PATTERN.search(remainder):
+        if not emojis:
+            return neutral, "skipped"
+        polarity = sum(EMOJI_POLARITY.get(e, 0) for e in emojis)
+        if polarity > 0:
+            return positive, "emoji"
+        if polarity < 0:
+            return negative, "emoji"
+        return neutral, "emoji"
+
+    if not LATIN_LETTER_PATTERN.search(remainder):
+        return neutral, "skipped"
+
+    return None, "model"
+
 
 class CommentDataset(Dataset):
     """Custom Dataset for loading a list of text comments."""
@@ -39,6 +100,7 @@ def collate_batch(
 
 def load_model(
     model_path: str = "models/bert_sentiment_vietnamese",
+    quantize: bool = False,
 ) -> Tuple[PreTrainedTokenizerBase, AutoModelForSequenceClassification, torch.device]:
     """Load tokenizer and model from local or Hugging Face, and move to device."""
 
@@ -60,6 +122,12 @@ def load_model(
         model.to(device)
         model.eval()
 
+        # Dynamic int8 quantization of the linear layers speeds up CPU inference
+        if quantize and device.type == "cpu":
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
         return tokenizer, model, device
 
     except Exception:
@@ -68,6 +136,49 @@ def load_model(
         )
 
 
+_model_cache = {}
+_model_lock = threading.Lock()
+
+
+def get_model(
+    model_path: str = "models/bert_sentiment_vietnamese",
+    quantize: bool = False,
+) -> Tuple[PreTrainedTokenizerBase, AutoModelForSequenceClassification, torch.device]:
+    """Return the loaded model for the path, loading it only on first use."""
+
+    with _model_lock:
+        if (model_path, quantize) not in _model_cache:
+            _model_cache[(model_path, quantize)] = load_model(model_path, quantize)
+        return _model_cache[(model_path, quantize)]
+
+
+def predict_labels(
+    texts: List[str],
+    model: AutoModelForSequenceClassification,
+    tokenizer: PreTrainedTokenizerBase,
+    device: torch.device,
+    labels: List[str],
+    batch_size: int = 16,
+) -> List[str]:
+    """Predict a sentiment label for each text in the list."""
+
+    dataset = CommentDataset(texts)
+    dataloader = DataLoader(
+        dataset, batch_size=batch_size, collate_fn=lambda x: collate_batch(x, tokenizer)
+    )
+
+    all_preds = []
+    with torch.no_grad():
+        for batch in dataloader:
+            batch = {k: v.to(device) for k, v in batch.items()}
+            outputs = model(**batch)
+            probs = torch.softmax(outputs.logits, dim=-1)
+            preds = torch.argmax(probs, dim=-1)
+            all_preds.extend(preds.cpu().tolist())
+
+    return [labels[p] for p in all_preds]
+
+
 def analyze_sentiment(
     df_comments_processed: pd.DataFrame,
     model: AutoModelForSequenceClassification,
@@ -78,23 +189,35 @@ def analyze_sentiment(
     """Predict sentiment labels for all comments in the DataFrame."""
 
     try:
-        texts = df_comments_processed["comment"].fillna("").tolist()
+        comments = df_comments_processed["comment"].fillna("").astype(str)
+        gated = [gate_comment(text, labels) for text in comments]
+        sentiments = np.array([label for label, _ in gated], dtype=object)
+        sources = np.array([source for _, source in gated], dtype=object)
+        needs_model = sources == "model"
+
+        texts = comments.to_numpy(dtype=object)[needs_model]
+        if "comment_key" in df_comments_processed.columns:
+            # Score one representative per near-duplicate group, then fan out
+            keys = df_comments_processed["comment_key"].to_numpy()[needs_model]
+            _, first_idx, inverse = np.unique(
+                keys, return_index=True, return_inverse=True
+            )
+        else:
+            first_idx = np.arange(len(texts))
+            inverse = first_idx
 
-        dataset = CommentDataset(texts)
-        dataloader = DataLoader(
-            dataset, batch_size=16, collate_fn=lambda x: collate_batch(x, tokenizer)
+        print(
+            f"Scoring {len(first_idx)} unique of {len(comments)} comments "
+            f"({len(comments) - len(texts)} labeled by rules)..."
         )
+        if len(first_idx):
+            predicted = predict_labels(
+                texts[first_idx].tolist(), model, tokenizer, device, labels
+            )
+            sentiments[needs_model] = np.array(predicted, dtype=object)[inverse.ravel()]
 
-        all_preds = []
-        with torch.no_grad():
-            for batch in dataloader:
-                batch = {k: v.to(device) for k, v in batch.items()}
-                outputs = model(**batch)
-                probs = torch.softmax(outputs.logits, dim=-1)
-                preds = torch.argmax(probs, dim=-1)
-                all_preds.extend(preds.cpu().tolist())
-
-        df_comments_processed["sentiment"] = [labels[p] for p in all_preds]
+        df_comments_processed["sentiment"] = sentiments
+        df_comments_processed["sentiment_source"] = sources
 
         return df_comments_processed
 
@@ -102,28 +225,219 @@ def analyze_sentiment(
         raise RuntimeError("Đã xảy ra lỗi khi phân tích cảm xúc. Vui lòng thử lại sau.")
 
 
+def get_tier_model(
+    model_path: Optional[str] = None, tier: str = "base"
+) -> Tuple[PreTrainedTokenizerBase, AutoModelForSequenceClassification, torch.device]:
+    """Return the cached model for a tier, or for an explicit path."""
+
+    tier_config = MODEL_TIERS[tier]
+    model_path = model_path or tier_config["model_path"]
+
+    if tier != "base" and not os.path.exists(model_path):
+        raise RuntimeError(
+            f"Chưa có mô hình '{tier}' tại {model_path}. "
+            "Vui lòng tạo mô hình bằng src/distillation.py."
+        )
+
+    return get_model(model_path, tier_config["quantize"])
+
+
 def run_sentiment_analysis(
     df_comments_processed: pd.DataFrame,
-    model_path: str = "models/bert_sentiment_vietnamese",
+    model_path: Optional[str] = None,
+    tier: str = "base",
 ) -> pd.DataFrame:
     """Run sentiment analysis pipeline and return the labeled DataFrame."""
 
     print("\nRunning sentiment analysis...")
-    labels = ["Tiêu cực", "Trung tính", "Tích cực"]
-    tokenizer, model, device = load_model(model_path)
-    return analyze_sentiment(df_comments_processed, model, tokenizer, device, labels)
+    tokenizer, model, device = get_tier_model(model_path, tier)
+    return analyze_sentiment(
+        df_comments_processed, model, tokenizer, device, SENTIMENT_LABELS
+    )
+
+
+def iter_comment_chunks(
+    input_path: str, chunk_size: int, skip_rows: int = 0
+) -> Iterator[pd.DataFrame]:
+    """Yield fixed-size chunks of a CSV or Parquet comments table after skip_rows."""
+
+    if input_path.endswith(".parquet"):
+        parquet_file = pq.ParquetFile(input_path)
+
+        # Row groups that were fully scored already are not decoded again
+        row_groups = []
+        for i in range(parquet_file.num_row_groups):
+            n_rows = parquet_file.metadata.row_group(i).num_rows
+            if not row_groups and skip_rows >= n_rows:
+                skip_rows -= n_rows
+            else:
+                row_groups.append(i)
+
+        for batch in parquet_file.iter_batches(
+            batch_size=chunk_size, row_groups=row_groups
+        ):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+    else:
+        # skiprows counts CSV records, so quoted multi-line comments stay intact
+        columns = pd.read_csv(input_path, nrows=0).columns
+        yield from pd.read_csv(
+            input_path,
+            chunksize=chunk_size,
+            skiprows=skip_rows + 1,
+            header=None,
+            names=columns,
+        )
 
 
-if __name__ == "__main__":
-    try:
-        df_comments_processed = pd.read_csv(
-            "data/processed/facebook_comments_processed.csv"
+def load_progress(progress_path: str) -> Optional[Dict[str, Any]]:
+    """Read the resume state of a chunked run, if there is one."""
+
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_progress(progress_path: str, progress: Dict[str, Any]) -> None:
+    """Atomically persist the resume state of a chunked run."""
+
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+def prepare_output(output_path: str, overwrite: bool = False) -> None:
+    """Refuse to write over a previous result that has no resume state."""
+
+    if output_path.endswith(".parquet"):
+        existing = (
+            glob.glob(os.path.join(output_path, "part-*.parquet"))
+            if os.path.isdir(output_path)
+            else []
+        )
+    else:
+        existing = [output_path] if os.path.exists(output_path) else []
+
+    if existing and not overwrite:
+        raise FileExistsError(
+            f"Đã có kết quả tại {output_path}. Dùng --overwrite để ghi đè."
         )
-        df_comments_processed_with_sentiment = run_sentiment_analysis(
-            df_comments_processed
+    for path in existing:
+        os.remove(path)
+
+
+def score_comments_file(
+    input_path: str,
+    output_path: str,
+    chunk_size: int = 10_000,
+    model_path: Optional[str] = None,
+    tier: str = "base",
+    overwrite: bool = False,
+    on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> int:
+    """Score a comments table chunk by chunk, appending results to disk."""
+
+    write_parquet = output_path.endswith(".parquet")
+    progress_path = f"{output_path}.progress.json"
+    progress = None if overwrite else load_progress(progress_path)
+
+    # Progress is counted in input rows, so a resume may use another chunk size
+    if progress is None:
+        prepare_output(output_path, overwrite)
+        progress = {
+            "input_path": os.path.abspath(input_path),
+            "rows_done": 0,
+            "output_bytes": 0,
+        }
+        save_progress(progress_path, progress)
+    elif progress["input_path"] != os.path.abspath(input_path):
+        raise ValueError(
+            f"{output_path} đang được tạo từ {progress['input_path']}. "
+            "Dùng --overwrite để chấm điểm lại từ đầu."
         )
-        print("Phân tích cảm xúc hoàn tất.")
-        print(df_comments_processed_with_sentiment.head())
+
+    # CSV output is one appended file, Parquet output is a directory of parts
+    # named by their first input row, so a rewritten part replaces itself
+    if write_parquet:
+        os.makedirs(output_path, exist_ok=True)
+    elif os.path.exists(output_path):
+        # Drop rows written after the last saved checkpoint
+        with open(output_path, "r+b") as f:
+            f.truncate(progress["output_bytes"])
+
+    total_rows = None
+    if input_path.endswith(".parquet"):
+        total_rows = pq.ParquetFile(input_path).metadata.num_rows
+
+    tokenizer, model, device = get_tier_model(model_path, tier)
+    rows_done = progress["rows_done"]
+    rows_this_run = 0
+    started = time.perf_counter()
+
+    for chunk in iter_comment_chunks(input_path, chunk_size, skip_rows=rows_done):
+        chunk = analyze_sentiment(chunk, model, tokenizer, device, SENTIMENT_LABELS)
+
+        if write_parquet:
+            chunk.to_parquet(
+                os.path.join(output_path, f"part-{rows_done:012d}.parquet"),
+                index=False,
+            )
+        else:
+            with open(output_path, "ab") as f:
+                chunk.to_csv(f, index=False, header=f.tell() == 0)
+                progress["output_bytes"] = f.tell()
+
+        rows_done += len(chunk)
+        rows_this_run += len(chunk)
+        progress["rows_done"] = rows_done
+        save_progress(progress_path, progress)
+
+        rate = rows_this_run / (time.perf_counter() - started)
+        total = f"/{total_rows}" if total_rows else ""
+        print(f"Scored {rows_done}{total} comments ({rate:.0f} rows/s)")
+        if on_progress:
+            on_progress(rows_done, total_rows)
+
+    return rows_done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run sentiment analysis.")
+    parser.add_argument("--input", help="CSV or Parquet comments table to score")
+    parser.add_argument(
+        "--output", help="Output .csv file or .parquet directory (chunked mode)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--tier", choices=list(MODEL_TIERS), default="base")
+    parser.add_argument(
+        "--overwrite", action="store_true", help="Discard an existing output"
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.input and args.output:
+            n_rows = score_comments_file(
+                args.input,
+                args.output,
+                args.chunk_size,
+                tier=args.tier,
+                overwrite=args.overwrite,
+            )
+            print(f"Phân tích cảm xúc hoàn tất: {n_rows} bình luận.")
+        else:
+            df_comments_processed = pd.read_csv(
+                "data/processed/facebook_comments_processed.csv"
+            )
+            df_comments_processed_with_sentiment = run_sentiment_analysis(
+                df_comments_processed, tier=args.tier
+            )
+            print("Phân tích cảm xúc hoàn tất.")
+            print(df_comments_processed_with_sentiment.head())
 
     except Exception as e:
         print(f"{e}")
@@ -1,17 +1,17 @@
+import io
 import re
+from functools import lru_cache
 
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
 from underthesea import word_tokenize
 from wordcloud import WordCloud
 
+MAX_CHART_POSTS = 50
 
-def render_post_overview_chart(df_posts):
-    if df_posts is None or df_posts.empty:
-        st.warning("⚠️ Không có dữ liệu bài viết để hiển thị biểu đồ.")
-        return
 
+@st.cache_data(show_spinner=False)
+def build_post_overview_figure(df_posts, max_posts=MAX_CHART_POSTS):
     metrics = ["reactions_count", "shares_count", "total_comments_crawled"]
     metric_name_map = {
         "reactions_count": "Lượt cảm xúc",
@@ -19,13 +19,23 @@ def render_post_overview_chart(df_posts):
         "total_comments_crawled": "Lượt bình luận",
     }
 
-    df_chart = df_posts[["content"] + metrics].copy()
-    df_chart = df_chart.melt(id_vars="content", var_name="Loại", value_name="Số lượng")
-    df_chart["Loại"] = df_chart["Loại"].replace(metric_name_map)
-    df_chart["Bài viết #"] = df_chart.groupby("content", sort=False).ngroup() + 1
-    df_chart["Nội dung"] = df_chart["content"].apply(
-        lambda x: x[:100] + "..." if len(x) > 100 else x
+    df_chart = df_posts[["content"] + metrics].reset_index(drop=True)
+    df_chart[metrics] = df_chart[metrics].fillna(0)
+    df_chart["Bài viết #"] = df_chart.index + 1
+
+    # Keep only the most engaging posts so large batches stay readable
+    if len(df_chart) > max_posts:
+        df_chart = df_chart.loc[df_chart[metrics].sum(axis=1).nlargest(max_posts).index]
+        df_chart = df_chart.sort_values("Bài viết #")
+
+    content = df_chart["content"].fillna("").astype(str)
+    df_chart["Nội dung"] = content.str.slice(0, 100).where(
+        content.str.len() <= 100, content.str.slice(0, 100) + "..."
+    )
+    df_chart = df_chart.drop(columns="content").melt(
+        id_vars=["Bài viết #", "Nội dung"], var_name="Loại", value_name="Số lượng"
     )
+    df_chart["Loại"] = df_chart["Loại"].replace(metric_name_map)
 
     fig = px.bar(
         df_chart,
@@ -40,11 +50,26 @@ def render_post_overview_chart(df_posts):
         xaxis_title="Bài viết",
         yaxis_title="Số lượng",
         legend_title="Loại tương tác",
-        xaxis=dict(tickmode="linear"),
+        xaxis=dict(type="category"),
         height=500,
     )
 
+    return fig
+
+
+def render_post_overview_chart(df_posts):
+    if df_posts is None or df_posts.empty:
+        st.warning("⚠️ Không có dữ liệu bài viết để hiển thị biểu đồ.")
+        return
+
+    fig = build_post_overview_figure(df_posts)
+
     st.markdown("#### Tổng quan tương tác bài viết")
+    if len(df_posts) > MAX_CHART_POSTS:
+        st.caption(
+            f"Hiển thị {MAX_CHART_POSTS} bài viết có tương tác cao nhất "
+            f"trên tổng số {len(df_posts)} bài viết."
+        )
     st.plotly_chart(fig, use_container_width=True)
 
 
@@ -84,9 +109,10 @@ def render_sentiment_pie_chart(sentiment_counts, comment_checked):
     st.plotly_chart(fig, use_container_width=True)
 
 
+@lru_cache(maxsize=None)
 def load_vietnamese_stopwords(path="vietnamese_stopwords.txt"):
     with open(path, encoding="utf-8") as f:
-        return set(line.strip() for line in f if line.strip())
+        return frozenset(line.strip() for line in f if line.strip())
 
 
 def preprocess_text_vi(text, stopwords_vi):
@@ -101,6 +127,27 @@ def preprocess_text_vi(text, stopwords_vi):
     return " ".join(filtered)
 
 
+@st.cache_data(show_spinner=False)
+def segment_comments(comments):
+    stopwords_vi = load_vietnamese_stopwords()
+    return comments.astype(str).apply(lambda x: preprocess_text_vi(x, stopwords_vi))
+
+
+@st.cache_data(show_spinner=False)
+def build_wordcloud_png(text):
+    wordcloud = WordCloud(
+        width=800,
+        height=400,
+        background_color="white",
+        colormap="magma",
+        max_words=200,
+    ).generate(text)
+
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
 def render_wordcloud(df_comments_with_sentiment):
     if df_comments_with_sentiment is None or df_comments_with_sentiment.empty:
         st.warning("⚠️ Không có dữ liệu để tạo WordCloud.")
@@ -119,37 +166,23 @@ def render_wordcloud(df_comments_with_sentiment):
             label_visibility="collapsed",
         )
 
+    processed_comments = segment_comments(df_comments_with_sentiment["comment"])
+
     if sentiment_label != "Tất cả":
-        df_filtered = df_comments_with_sentiment[
+        processed_comments = processed_comments[
             df_comments_with_sentiment["sentiment"] == sentiment_label
         ]
-    else:
-        df_filtered = df_comments_with_sentiment
 
-    if df_filtered.empty:
+    if processed_comments.empty:
         st.warning(
             f"⚠️ Không có bình luận nào với cảm xúc '{sentiment_label}' để tạo WordCloud."
         )
         return
 
-    comments = df_filtered["comment"].astype(str)
-    stopwords_vi = load_vietnamese_stopwords()
-    processed_comments = comments.apply(lambda x: preprocess_text_vi(x, stopwords_vi))
     text = " ".join(processed_comments).replace("_", " ")
 
     if not text.strip():
         st.warning("⚠️ Không có dữ liệu để tạo WordCloud")
         return
 
-    wordcloud = WordCloud(
-        width=800,
-        height=400,
-        background_color="white",
-        colormap="magma",
-        max_words=200,
-    ).generate(text)
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation="bilinear")
-    ax.axis("off")
-    st.pyplot(fig)
+    st.image(build_wordcloud_png(text), use_container_width=True)
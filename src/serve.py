@@ -0,0 +1,47 @@
+import os
+import sys
+import threading
+import time
+
+
+def warm_up():
+    """Load the model and underthesea once, then write the warm-up marker file."""
+
+    started = time.perf_counter()
+    try:
+        from src.sentiment_analysis import get_model
+        from src.sentiment_charts import load_vietnamese_stopwords, preprocess_text_vi
+
+        get_model()
+        preprocess_text_vi("khởi động", load_vietnamese_stopwords())
+        elapsed = time.perf_counter() - started
+        print(f"[warmup] Model and tokenizer ready in {elapsed:.2f}s")
+
+        marker_path = os.getenv("WARMUP_MARKER_FILE")
+        if marker_path:
+            with open(marker_path, "w") as f:
+                f.write(f"{elapsed:.2f}\n")
+    except Exception as e:
+        print(f"[warmup] Warm-up failed: {e}")
+
+
+def main():
+    """Start the warm-up in this process, then run the Streamlit app in it."""
+
+    from streamlit.web import cli as stcli
+
+    # A marker left by a previous run of the container does not mean warm
+    marker_path = os.getenv("WARMUP_MARKER_FILE")
+    if marker_path and os.path.exists(marker_path):
+        os.remove(marker_path)
+
+    # app.py imports the same src.* modules, so sessions reuse the loaded model
+    os.environ.setdefault("WARMUP_ON_START", "0")
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+    sys.argv = ["streamlit", "run", "app.py", *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()